@@ -0,0 +1,121 @@
+"""Many games of snake stepped together with numpy array operations"""
+
+import numpy as np
+from snake_state import DIRECTIONS
+
+OFFSETS = np.array([[0, -1], [-1, 0], [0, 1], [1, 0]])
+OPPOSITES = np.array([2, 3, 0, 1])
+
+class BatchSnakeEnv:
+    """
+    {count} independent games of snake following the same rules as {snake_state.SnakeState}
+    directions are stored as indices into {DIRECTIONS}: 0 = UP, 1 = LEFT, 2 = DOWN, 3 = RIGHT
+    games that end during {self.step} are reset straight away
+    :example:
+
+        env = BatchSnakeEnv(10000)
+        for _ in range(1000):
+            rewards, dones = env.step(np.random.randint(0, 4, env.count))
+        print(env.episode_scores.mean())
+    """
+
+    def __init__(self, count: int, width: int = 20, height: int = 20, seed: int = None):
+        """
+        :count: the number of games to run at once
+        :width: the number of cells in a row of each grid
+        :height: the number of cells in a column of each grid
+        :seed: Optional. defaults to None. seed for the random number generator that places fruit
+        """
+        self.count = count
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.indices = np.arange(count)
+        self.heads = np.empty((count, 2), np.int64)
+        self.directions = np.empty(count, np.int64)
+        # the number of moves each body cell stays occupied for, 0 for empty cells
+        self.body = np.zeros((count, width * height), np.int32)
+        self.lengths = np.empty(count, np.int32)
+        self.length_to_add = np.empty(count, np.int32)
+        self.fruits = np.empty((count, 2), np.int64)
+        self.scores = np.empty(count, np.int32)
+        self.ticks = np.empty(count, np.int64)
+        self.episode_scores = np.zeros(count, np.int32)
+        self.episode_ticks = np.zeros(count, np.int64)
+        self.reset()
+
+    @property
+    def occupancy(self) -> np.ndarray:
+        """a (count, height, width) bool array of the cells covered by each tail"""
+        return (self.body > 0).reshape(self.count, self.height, self.width)
+
+    def head_cells(self) -> np.ndarray:
+        """index of each head in the flattened grid"""
+        return self.heads[:, 1] * self.width + self.heads[:, 0]
+
+    def reset(self, mask: np.ndarray = None):
+        """
+        Start new games
+        :mask: Optional. defaults to None. a bool array selecting the games to reset, every game is reset if mask is None
+        """
+        if mask is None:
+            mask = np.ones(self.count, bool)
+        self.heads[mask] = (self.width // 2, self.height // 2)
+        self.directions[mask] = 0
+        self.body[mask] = 0
+        self.lengths[mask] = 0
+        self.length_to_add[mask] = 2
+        self.scores[mask] = 0
+        self.ticks[mask] = 0
+        self.new_fruit(mask)
+
+    def new_fruit(self, mask: np.ndarray):
+        """
+        Move the fruit of the games selected by {mask} to a random cell not covered by the snake
+        games whose snake fills the grid get a fruit at (-1, -1) which can never be eaten
+        """
+        selected = np.flatnonzero(mask)
+        if not len(selected):
+            return
+        free = self.body[selected] == 0
+        free[np.arange(len(selected)), self.head_cells()[selected]] = False
+        choice = np.argmax(self.rng.random(free.shape) * free, axis = 1)
+        has_free = free.any(axis = 1)
+        self.fruits[selected, 0] = np.where(has_free, choice % self.width, -1)
+        self.fruits[selected, 1] = np.where(has_free, choice // self.width, -1)
+
+    def step(self, actions: np.ndarray = None) -> (np.ndarray, np.ndarray):
+        """
+        Move every snake once
+        :actions: Optional. defaults to None. an array of direction indices, one per game.
+            actions that would turn a snake back on itself are ignored
+        :returns: (rewards, dones). rewards is 1 for eating a fruit and -1 for dying.
+            the score and tick count of finished games are kept in {self.episode_scores} and {self.episode_ticks}
+        """
+        if actions is not None:
+            actions = np.asarray(actions)
+            self.directions = np.where(actions == OPPOSITES[self.directions], self.directions, actions)
+        previous_cells = self.head_cells()
+        self.heads += OFFSETS[self.directions]
+        growing = self.length_to_add > 0
+        self.length_to_add -= growing
+        self.lengths += growing
+        self.body -= (self.body > 0) & ~growing[:, None]
+        self.body[self.indices, previous_cells] = self.lengths
+        self.ticks += 1
+
+        x, y = self.heads[:, 0], self.heads[:, 1]
+        dones = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        head_cells = np.where(dones, 0, self.head_cells())
+        dones |= self.body[self.indices, head_cells] > 0
+        ate = ~dones & (self.heads == self.fruits).all(axis = 1)
+        self.scores += ate
+        self.length_to_add += 2 * ate
+        self.new_fruit(ate)
+
+        rewards = ate.astype(np.float32) - dones
+        if dones.any():
+            self.episode_scores[dones] = self.scores[dones]
+            self.episode_ticks[dones] = self.ticks[dones]
+            self.reset(dones)
+        return rewards, dones
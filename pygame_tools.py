@@ -1,9 +1,11 @@
 """Basic classes for creating a pygame application"""
 
-import pygame, math, sys
+import pygame, heapq, itertools, math, operator, sys, time
+import numpy as np
+from array import array
+from collections import OrderedDict
 from glob import glob
 from pygame.locals import *
-from recordclass import RecordClass
 
 class TrueEvery:
     """This is a functor that creates a function that returns true once every {self.count} calls"""
@@ -55,9 +57,173 @@ class TrueEvery:
         self.reset()
         return False
 
-class Point(RecordClass):
-    x: float
-    y: float
+class Timer:
+    """A job created by a {Scheduler}"""
+
+    def __init__(self, callback: callable, due: float, interval: float = None):
+        """
+        :callback: the function to call
+        :due: the time the callback should next be called at
+        :interval: Optional. defaults to None. the seconds between calls of a repeating job, None for a one-shot job
+        """
+        self.callback = callback
+        self.due = due
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the job from being called again"""
+        self.cancelled = True
+
+class Scheduler:
+    """
+    Calls functions after an amount of time has passed rather than after a number of frames
+    :example:
+
+        scheduler = Scheduler()
+        move_timer = scheduler.call_every(0.2, snake.move)
+        scheduler.call_later(3, move_timer.cancel)
+        while True:
+            scheduler.run_pending()
+            time.sleep(scheduler.time_until_next())
+    """
+
+    def __init__(self, clock: callable = time.monotonic, max_catch_up: int = 5):
+        """
+        :clock: Optional. defaults to time.monotonic. a function returning the current time in seconds
+        :max_catch_up: Optional. defaults to 5. the most calls a repeating job gets from one {self.run_pending}, calls missed beyond that are skipped
+        """
+        self.clock = clock
+        self.max_catch_up = max_catch_up
+        self.timers = []
+        self.counter = itertools.count()
+        self.paused_at = None
+
+    def schedule(self, timer: Timer) -> Timer:
+        # the counter keeps timers that are due at the same time in the order they were scheduled
+        heapq.heappush(self.timers, (timer.due, next(self.counter), timer))
+        return timer
+
+    def call_later(self, delay: float, callback: callable) -> Timer:
+        """Call {callback} once after {delay} seconds"""
+        return self.schedule(Timer(callback, self.clock() + delay))
+
+    def call_every(self, interval: float, callback: callable, delay: float = None) -> Timer:
+        """
+        Call {callback} every {interval} seconds
+        if calls are missed, e.g.: during a slow frame, the next {self.run_pending} makes up to {self.max_catch_up} of them
+        :delay: Optional. defaults to {interval}. the seconds until the first call
+        """
+        if interval <= 0:
+            raise ValueError('interval must be greater than 0')
+        return self.schedule(Timer(callback, self.clock() + (interval if delay is None else delay), interval))
+
+    def run_pending(self) -> int:
+        """
+        Call every job that is due
+        :returns: the number of calls made
+        """
+        now = self.clock()
+        calls = 0
+        repeats = {}
+        while self.timers and self.timers[0][0] <= now:
+            _due, _count, timer = heapq.heappop(self.timers)
+            if timer.cancelled:
+                continue
+            timer.callback()
+            calls += 1
+            if timer.interval is not None and not timer.cancelled:
+                timer.due += timer.interval
+                repeats[timer] = repeats.get(timer, 0) + 1
+                if repeats[timer] >= self.max_catch_up and timer.due <= now:
+                    # skip the rest of the missed calls, keeping the job on the same beat
+                    timer.due += ((now - timer.due) // timer.interval + 1) * timer.interval
+                self.schedule(timer)
+        return calls
+
+    def delay(self, seconds: float):
+        """Push every job back by {seconds}"""
+        # every due time moves by the same amount, so the heap stays in order
+        self.timers = [(due + seconds, count, timer) for due, count, timer in self.timers]
+        for _due, _count, timer in self.timers:
+            timer.due += seconds
+
+    def pause(self):
+        """Stop time for the jobs until {self.resume}, e.g.: while another screen's loop runs"""
+        if self.paused_at is None:
+            self.paused_at = self.clock()
+
+    def resume(self):
+        """Delay every job by the time since {self.pause}"""
+        if self.paused_at is not None:
+            self.delay(self.clock() - self.paused_at)
+            self.paused_at = None
+
+    def time_until_next(self) -> float:
+        """:returns: the seconds until the next job is due, 0 if one is overdue, or None if nothing is scheduled"""
+        while self.timers and self.timers[0][2].cancelled:
+            heapq.heappop(self.timers)
+        if not self.timers:
+            return None
+        return max(self.timers[0][0] - self.clock(), 0.0)
+
+    def clear(self):
+        """Cancel every job"""
+        for _due, _count, timer in self.timers:
+            timer.cancel()
+        self.timers.clear()
+
+class Point:
+    """
+    A mutable 2d point that can be used anywhere pygame expects a pair of coordinates
+    points hash by value, so a point should not be changed while it is in a set or used as a dict key
+    """
+
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: float = 0, y: float = 0):
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def _make(cls, iterable) -> 'Point':
+        """Make a point from any pair of coordinates"""
+        x, y = iterable
+        return cls(x, y)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __getitem__(self, index: int) -> float:
+        return (self.x, self.y)[index]
+
+    def __setitem__(self, index: int, value: float):
+        if index == 0 or index == -2:
+            self.x = value
+        elif index == 1 or index == -1:
+            self.y = value
+        else:
+            raise IndexError('Point index out of range')
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Point):
+            return self.x == other.x and self.y == other.y
+        if isinstance(other, (tuple, list)):
+            return len(other) == 2 and self.x == other[0] and self.y == other[1]
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f'Point(x={self.x!r}, y={self.y!r})'
+
+    def __copy__(self) -> 'Point':
+        return Point(self.x, self.y)
 
     @staticmethod
     def distance(pos1: 'Point', pos2: 'Point') -> 'Point':
@@ -68,12 +234,289 @@ class Point(RecordClass):
             pos2 = Point._make(pos2)
         return math.sqrt((pos2.x - pos1.x) ** 2 + (pos2.y - pos1.y) ** 2)
 
+    @staticmethod
+    def squared_distance(pos1: 'Point', pos2: 'Point') -> float:
+        """takes two points and returns the square of the distance between them, cheaper than {Point.distance} for comparisons"""
+        dx = pos2[0] - pos1[0]
+        dy = pos2[1] - pos1[1]
+        return dx * dx + dy * dy
+
+    @staticmethod
+    def squared_distances(points1, points2) -> np.ndarray:
+        """
+        The squares of the distances between many points at once
+        :points1: a Point, a PointArray, or anything numpy can turn into an (n, 2) array
+        :points2: the same as points1. the two are broadcast against each other,
+            so one point against many points gives the distance to each of them
+        """
+        difference = as_coordinates(points2) - as_coordinates(points1)
+        return np.einsum('...i,...i->...', difference, difference)
+
+    @staticmethod
+    def distances(points1, points2) -> np.ndarray:
+        """The distances between many points at once, see {Point.squared_distances}"""
+        return np.sqrt(Point.squared_distances(points1, points2))
+
+class PointArray:
+    """
+    Many points packed into one array.array as x, y pairs, far smaller than a list of Points
+    :example:
+
+        body = PointArray([(1, 2), (1, 3)])
+        body.append(Point(1, 4))
+        body[0] # Point(x=1, y=2)
+        body.to_numpy() # array([[1, 2], [1, 3], [1, 4]])
+    """
+
+    def __init__(self, points = (), typecode: str = 'l'):
+        """
+        :points: Optional. defaults to empty. the pairs of coordinates to start with
+        :typecode: Optional. defaults to 'l'. the array.array typecode of the coordinates, e.g.: 'd' for floats
+        """
+        self.data = array(typecode)
+        self.extend(points)
+
+    def __len__(self) -> int:
+        return len(self.data) // 2
+
+    def __getitem__(self, index):
+        """:index: an int for a single Point, or a slice for a new PointArray"""
+        if isinstance(index, slice):
+            return PointArray((self[i] for i in range(*index.indices(len(self)))), self.data.typecode)
+        index = self.check_index(index)
+        return Point(self.data[index * 2], self.data[index * 2 + 1])
+
+    def __setitem__(self, index, point):
+        """:index: an int to replace a single Point, or a slice to replace with a sequence of points like a list does"""
+        if isinstance(index, slice):
+            points = list(self)
+            points[index] = [tuple(p) for p in point]
+            self.clear()
+            self.extend(points)
+            return
+        index = self.check_index(index)
+        self.data[index * 2], self.data[index * 2 + 1] = point
+
+    def check_index(self, index: int) -> int:
+        """:returns: {index} with negative indices counted from the end"""
+        try:
+            # operator.index also accepts numpy integers
+            index = operator.index(index)
+        except TypeError:
+            raise TypeError(f'PointArray indices must be integers or slices, not {type(index).__name__}') from None
+        length = len(self)
+        if not -length <= index < length:
+            raise IndexError('PointArray index out of range')
+        return index + length if index < 0 else index
+
+    def __iter__(self):
+        data = self.data
+        for i in range(0, len(data), 2):
+            yield Point(data[i], data[i + 1])
+
+    def append(self, point: Point):
+        self.data.extend(point)
+
+    def extend(self, points):
+        for point in points:
+            self.data.extend(point)
+
+    def clear(self):
+        del self.data[:]
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        A (len(self), 2) numpy array sharing memory with {self.data}
+        while the array is alive {self.data} cannot change size, so {self.append}, {self.extend}, {self.clear}
+        and slice assignment raise BufferError. keep the array only as long as it is needed, or copy it
+        """
+        return np.frombuffer(self.data, dtype = self.data.typecode).reshape(-1, 2)
+
+def as_coordinates(points) -> np.ndarray:
+    """Turn a Point, a PointArray, or a sequence of pairs into a numpy array of coordinates, see {PointArray.to_numpy} for a PointArray"""
+    if isinstance(points, PointArray):
+        return points.to_numpy()
+    if isinstance(points, Point):
+        return np.array((points.x, points.y))
+    return np.asarray(points)
+
 def clip_surface(surface: pygame.Surface, rect: Rect) -> pygame.Surface:
     """Copy part of a pygame.Surface"""
     cropped = pygame.Surface(rect.size)
     cropped.blit(surface, (0, 0), rect)
     return cropped
 
+class TextCache:
+    """
+    A least recently used cache of rendered text
+    the surfaces returned are shared, so they should be blitted and not drawn on
+    :example:
+
+        font = pygame.font.SysFont('consolas', 25)
+        cache = TextCache()
+        screen.blit(cache.render(font, 'Score: 0', True, (255, 255, 255)), (2, 2))
+    """
+
+    def __init__(self, max_size: int = 256):
+        """:max_size: Optional. defaults to 256. the number of surfaces kept before the least recently used is dropped"""
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, color: Color) -> pygame.Surface:
+        """The same as font.render(text, antialias, color) but only rendered the first time"""
+        key = (font, text, antialias, color if isinstance(color, (tuple, str)) else tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = font.render(text, antialias, color)
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last = False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+text_cache = TextCache()
+
+def render_text(font: pygame.font.Font, text: str, antialias: bool, color: Color) -> pygame.Surface:
+    """Render text through the shared {text_cache}"""
+    return text_cache.render(font, text, antialias, color)
+
+class AssetCache:
+    """
+    Loads each image once and shares it, keyed by its path and the transforms applied to it
+    images are reference counted: {self.load} takes a reference and {self.release} gives it back.
+    images with no references are kept until more than {self.max_unused} of them pile up, then the least recently used are dropped
+    the surfaces returned are shared, so they should be blitted and not drawn on
+    :example:
+
+        cache = AssetCache()
+        head_left = cache.load('assets/head.png', rotation = 90, convert = 'convert_alpha')
+        ...
+        cache.release('assets/head.png', rotation = 90, convert = 'convert_alpha')
+    """
+
+    def __init__(self, max_unused: int = 64):
+        """:max_unused: Optional. defaults to 64. the number of images without references kept for later use"""
+        self.max_unused = max_unused
+        # key: [surface, reference count]
+        self.entries = {}
+        self.unused = OrderedDict()
+
+    @staticmethod
+    def make_key(path: str, rotation: int = 0, scale: Point = None, convert: str = None) -> tuple:
+        return (path, rotation % 360, tuple(scale) if scale else None, convert)
+
+    def load(self, path: str, rotation: int = 0, scale: Point = None, convert: str = None) -> pygame.Surface:
+        """
+        Get an image, loading and transforming it only if it is not already cached
+        :path: the path of the image file
+        :rotation: Optional. defaults to 0. degrees to rotate the image counterclockwise, see pygame.transform.rotate
+        :scale: Optional. defaults to None. the size to scale the image to after rotating it
+        :convert: Optional. defaults to None. 'convert' or 'convert_alpha' to convert the image to the display format, which needs a display mode set
+        """
+        key = self.make_key(path, rotation, scale, convert)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [self.create(*key), 0]
+        entry[1] += 1
+        self.unused.pop(key, None)
+        return entry[0]
+
+    def release(self, path: str, rotation: int = 0, scale: Point = None, convert: str = None):
+        """Give back a reference taken by {self.load} with the same arguments"""
+        key = self.make_key(path, rotation, scale, convert)
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= 0:
+            raise ValueError(f'{key} is not loaded')
+        entry[1] -= 1
+        if entry[1] == 0:
+            self.add_unused(key)
+
+    def references(self, path: str, rotation: int = 0, scale: Point = None, convert: str = None) -> int:
+        entry = self.entries.get(self.make_key(path, rotation, scale, convert))
+        return entry[1] if entry else 0
+
+    def create(self, path: str, rotation: int, scale: tuple, convert: str) -> pygame.Surface:
+        """Make a transformed image from the cached original"""
+        if not rotation and not scale and not convert:
+            return pygame.image.load(path)
+        key = (path, 0, None, None)
+        if key in self.entries:
+            surface = self.entries[key][0]
+        else:
+            # kept locally as well, adding it to the unused images can evict it straight away
+            surface = pygame.image.load(path)
+            self.entries[key] = [surface, 0]
+            self.add_unused(key)
+        if rotation:
+            surface = pygame.transform.rotate(surface, rotation)
+        if scale:
+            surface = pygame.transform.scale(surface, scale)
+        if convert:
+            surface = getattr(surface, convert)()
+        return surface
+
+    def add_unused(self, key: tuple):
+        self.unused[key] = None
+        while len(self.unused) > self.max_unused:
+            del self.entries[self.unused.popitem(last = False)[0]]
+
+    def clear(self):
+        """Forget every image, including ones that still have references"""
+        self.entries.clear()
+        self.unused.clear()
+
+asset_cache = AssetCache()
+
+def load_image(path: str, rotation: int = 0, scale: Point = None, convert: str = None) -> pygame.Surface:
+    """Load an image through the shared {asset_cache}, see {AssetCache.load}"""
+    return asset_cache.load(path, rotation, scale, convert)
+
+class TextureAtlas:
+    """
+    Packs many small surfaces into one surface converted to the display format and blits them by key
+    :example:
+
+        atlas = TextureAtlas({'fruit': pygame.image.load('assets/fruit.png'), 'head': pygame.image.load('assets/head.png')})
+        atlas.blit(screen, 'fruit', (10, 10))
+    """
+
+    def __init__(self, surfaces: dict, alpha: bool = True):
+        """
+        :surfaces: the surfaces to pack, keyed by the name they are blitted with
+        :alpha: Optional. defaults to True. keep per pixel alpha, if False the atlas is converted without it
+        """
+        self.rects = {}
+        row_width = max(max((surface.get_width() for surface in surfaces.values()), default = 0), int(math.sqrt(sum(surface.get_width() * surface.get_height() for surface in surfaces.values()))))
+        x = y = row_height = width = 0
+        for key, surface in sorted(surfaces.items(), key = lambda item: -item[1].get_height()):
+            if x + surface.get_width() > row_width:
+                x = 0
+                y += row_height
+                row_height = 0
+            self.rects[key] = Rect((x, y), surface.get_size())
+            x += surface.get_width()
+            width = max(width, x)
+            row_height = max(row_height, surface.get_height())
+        self.surface = pygame.Surface((max(width, 1), max(y + row_height, 1)), SRCALPHA if alpha else 0)
+        for key, surface in surfaces.items():
+            self.surface.blit(surface, self.rects[key])
+        if pygame.display.get_surface():
+            self.surface = self.surface.convert_alpha() if alpha else self.surface.convert()
+
+    def blit(self, screen: pygame.Surface, key, pos: Point, special_flags: int = 0) -> Rect:
+        """
+        Draw the surface stored as {key} onto {screen} at {pos}
+        :special_flags: Optional. defaults to 0. passed on to pygame.Surface.blit
+        """
+        return screen.blit(self.surface, pos, self.rects[key], special_flags)
+
+    def get_surface(self, key) -> pygame.Surface:
+        """A subsurface of the atlas holding the surface stored as {key}"""
+        return self.surface.subsurface(self.rects[key])
+
 class Animation:
     """
     Represents a object that has multiple frames each with diffrent length
@@ -110,6 +553,7 @@ class Animation:
         self.frame_data = frame_data
         self.repititions = repititions
         self.finished = True if self.repititions == 0 else False
+        self.file_names = []
         self.load(glob_path, frame_data)
 
     def update(self):
@@ -135,6 +579,12 @@ class Animation:
         self.frame_index = 0
         self.frames_until_next = self.frames[0][1]
 
+    def release(self):
+        """Give the frames back to {asset_cache} once the animation is no longer drawn, {self.load} can bring them back"""
+        for file_name in self.file_names:
+            asset_cache.release(file_name)
+        self.file_names = []
+
     def load(self, glob_path: str, frame_data):
         """
         Load animations from a glob path
@@ -147,7 +597,11 @@ class Animation:
         file_names = glob(glob_path)
         if len(file_names) != len(frame_data):
             raise ValueError('Length of frame_data and the number of files must be the same')
-        self.frames = [(pygame.image.load(file_name), frame_data[i]) for i, file_name in enumerate(file_names)]
+        # load the new frames before releasing the old ones, so frames used by both stay cached
+        frames = [(load_image(file_name), frame_data[i]) for i, file_name in enumerate(file_names)]
+        self.release()
+        self.file_names = file_names
+        self.frames = frames
         self.frame_count = len(self.frames)
         self.frame_index = 0
         self.frames_until_next = self.frames[0][1]
@@ -179,10 +633,125 @@ class Circle:
         pygame.draw.rect(screen, self.color, self.rect, self.width, self.radius)
 
     def collide_point(self, point: Point, only_border: bool = False) -> bool:
-        if not isinstance(point, Point):
-            point = Point._make(point)
-        dist = int(Point.distance(self.center, point))
-        return only_border and dist <= self.radius and dist >= self.radius - self.width + 1 or (not only_border and dist <= self.radius)
+        # int(distance) <= radius is the same as distance squared < (radius + 1) squared, which needs no sqrt
+        squared_distance = Point.squared_distance(self.center, point)
+        inside = squared_distance < (self.radius + 1) ** 2
+        if not only_border:
+            return inside
+        inner_radius = self.radius - self.width + 1
+        return inside and (inner_radius <= 0 or squared_distance >= inner_radius ** 2)
+
+class CircleGroup:
+    """
+    Many circles hit tested together, with their centers and radii kept in numpy arrays
+    call {self.rebuild} after moving or resizing a circle in the group
+    :example:
+
+        targets = CircleGroup([Circle((50, 50), 10, (255, 0, 0)), Circle((80, 50), 10, (0, 255, 0))])
+        for circle in targets.collide_point(pygame.mouse.get_pos()):
+            circle.color = (0, 0, 255)
+    """
+
+    def __init__(self, circles: [Circle] = ()):
+        self.circles = list(circles)
+        self.rebuild()
+
+    def __len__(self) -> int:
+        return len(self.circles)
+
+    def add(self, circle: Circle):
+        self.circles.append(circle)
+        self.rebuild()
+
+    def remove(self, circle: Circle):
+        self.circles.remove(circle)
+        self.rebuild()
+
+    def rebuild(self):
+        """Copy the centers, radii and widths of {self.circles} into arrays"""
+        self.centers = np.array([(circle.center.x, circle.center.y) for circle in self.circles]).reshape(-1, 2)
+        self.radii = np.array([circle.radius for circle in self.circles], dtype = np.int64)
+        self.widths = np.array([circle.width for circle in self.circles], dtype = np.int64)
+
+    def collide_mask(self, points, only_border: bool = False) -> np.ndarray:
+        """
+        Test every point against every circle, with the same rules as {Circle.collide_point}
+        :points: a single point, or anything {as_coordinates} accepts
+        :returns: a bool array with one row per point and one column per circle, or a single row if {points} is one point
+        """
+        difference = as_coordinates(points)[..., None, :] - self.centers
+        squared_distances = np.einsum('...i,...i->...', difference, difference)
+        inside = squared_distances < (self.radii + 1) ** 2
+        if only_border:
+            inner_radii = self.radii - self.widths + 1
+            inside &= (inner_radii <= 0) | (squared_distances >= inner_radii ** 2)
+        return inside
+
+    def collide_point(self, point: Point, only_border: bool = False) -> [Circle]:
+        """
+        The circles that contain {point}
+        :point: a single point, or many points as anything {as_coordinates} accepts
+        :returns: a list of circles, or a list of circles for each point if {point} is many points
+        """
+        mask = self.collide_mask(point, only_border)
+        if mask.ndim == 1:
+            return [self.circles[i] for i in np.flatnonzero(mask)]
+        return [[self.circles[i] for i in np.flatnonzero(row)] for row in mask]
+
+    def draw(self, screen: pygame.Surface):
+        for circle in self.circles:
+            circle.draw(screen)
+
+class RectGrid:
+    """
+    A uniform grid over a list of rects, so finding the rects that contain a point only tests the rects in one cell
+    the grid does not follow changes to the rects, make a new one after moving them
+    :example:
+
+        grid = RectGrid([button.rect for button in buttons])
+        for i in grid.query(mouse_pos):
+            buttons[i]()
+    """
+
+    def __init__(self, rects: [Rect], cell_size: int = 64):
+        """
+        :rects: the rects to index
+        :cell_size: Optional. defaults to 64. the width and height of a grid cell in pixels
+        """
+        self.rects = [Rect(rect) for rect in rects]
+        self.cell_size = cell_size
+        self.cells = {}
+        for i, rect in enumerate(self.rects):
+            for cell_x in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+                for cell_y in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                    self.cells.setdefault((cell_x, cell_y), []).append(i)
+
+    def query(self, pos: Point) -> [int]:
+        """The indices of the rects that contain {pos}, in the order they were given"""
+        # collidepoint truncates float coordinates, so the cell has to be found the same way
+        x, y = int(pos[0]), int(pos[1])
+        candidates = self.cells.get((x // self.cell_size, y // self.cell_size), ())
+        return [i for i in candidates if self.rects[i].collidepoint(x, y)]
+
+def render_button(size: Point, rect_color: Color, rect_line_width: int, border_radius: int, border_size: int, border_color: Color, font: pygame.font.Font, text: str, font_color: Color) -> (pygame.Surface, Point):
+    """
+    Draw a button with its border and centered text onto a new transparent surface
+    the surface is {size} unless the text is bigger than the button, then it grows to fit the text
+    :returns: (surface, offset). offset is where the button's top left corner is on the surface
+    """
+    text_obj = render_text(font, text, True, font_color)
+    text_size = text_obj.get_size()
+    # floored like blitting at a float position on the screen would be
+    text_pos = Point(math.floor(size[0] // 2 - text_size[0] / 2), math.floor(size[1] // 2 - text_size[1] / 2))
+    bounds = Rect((0, 0), size).union(Rect(text_pos, text_size))
+    offset = Point(-bounds.x, -bounds.y)
+    surface = pygame.Surface(bounds.size, SRCALPHA)
+    rect = Rect(offset, size)
+    pygame.draw.rect(surface, rect_color, rect, rect_line_width, border_radius)
+    if border_size > 0:
+        pygame.draw.rect(surface, border_color, rect, border_size, border_radius)
+    surface.blit(text_obj, (text_pos.x + offset.x, text_pos.y + offset.y))
+    return surface, offset
 
 class Button:
     """A button in a pygame application"""
@@ -216,15 +785,30 @@ class Button:
         self.clicked_color = clicked_color
         self.clicked = False
         self.highlight = False
+        self.surfaces = {}
+        self.surfaces_key = None
 
     def draw(self, screen: pygame.Surface, override_highlight: bool = None):
-        pygame.draw.rect(screen, self.clicked_color if self.clicked else self.highlight_color if (override_highlight == None and self.highlight) or override_highlight else self.rect_color, self.rect, self.rect_line_width, self.border_radius)
+        state = 'clicked' if self.clicked else 'highlight' if (override_highlight == None and self.highlight) or override_highlight else 'normal'
         self.clicked = False
-        if self.border_size > 0:
-            pygame.draw.rect(screen, self.border_color, self.rect, self.border_size, self.border_radius)
-        text_obj = self.font.render(self.text, True, self.font_color)
-        text_size = text_obj.get_size()
-        screen.blit(text_obj, (self.rect.centerx - text_size[0] / 2, self.rect.centery - text_size[1] / 2))
+        surface, offset = self.get_state_surface(state)
+        screen.blit(surface, (self.rect.x - offset.x, self.rect.y - offset.y))
+
+    def get_state_surface(self, state: str) -> (pygame.Surface, Point):
+        """
+        The pre-rendered button for {state}, rebuilt only when the button's properties change
+        :state: 'normal', 'highlight', or 'clicked'
+        :returns: the surface and offset from {render_button}
+        """
+        key = (self.rect.size, self.text, self.font, self.font_color, self.rect_color, self.highlight_color, self.clicked_color, self.rect_line_width, self.border_radius, self.border_size, self.border_color)
+        if key != self.surfaces_key:
+            self.surfaces = {}
+            self.surfaces_key = key
+        surface = self.surfaces.get(state)
+        if surface is None:
+            color = self.clicked_color if state == 'clicked' else self.highlight_color if state == 'highlight' else self.rect_color
+            surface = self.surfaces[state] = render_button(self.rect.size, color, self.rect_line_width, self.border_radius, self.border_size, self.border_color, self.font, self.text, self.font_color)
+        return surface
 
     def __call__(self):
         """Overwrite the () operator on the button object"""
@@ -273,22 +857,32 @@ class ToggleButton:
         self.off_border_color = off_border_color if off_border_color else on_border_color
         self.highlight = False
         self.toggled = toggled
+        self.surfaces = {}
+        self.surfaces_key = None
 
     def draw(self, screen: pygame.Surface, override_highlight: bool = None):
-        if self.toggled:
-            pygame.draw.rect(screen, self.on_highlight_color if (override_highlight == None and self.highlight) or override_highlight else self.on_rect_color, self.rect, self.rect_line_width, self.border_radius)
-            if self.border_size > 0:
-                pygame.draw.rect(screen, self.on_border_color, self.rect, self.border_size, self.border_radius)
-            text_obj = self.font.render(self.on_text, True, self.on_font_color)
-            text_size = text_obj.get_size()
-            screen.blit(text_obj, (self.rect.centerx - text_size[0] / 2, self.rect.centery - text_size[1] / 2))
-        else:
-            pygame.draw.rect(screen, self.off_highlight_color if (override_highlight == None and self.highlight) or override_highlight else self.off_rect_color, self.rect, self.rect_line_width, self.border_radius)
-            if self.border_size > 0:
-                pygame.draw.rect(screen, self.off_border_color, self.rect, self.border_size, self.border_radius)
-            text_obj = self.font.render(self.off_text, True, self.off_font_color)
-            text_size = text_obj.get_size()
-            screen.blit(text_obj, (self.rect.centerx - text_size[0] / 2, self.rect.centery - text_size[1] / 2))
+        surface, offset = self.get_state_surface(self.toggled, (override_highlight == None and self.highlight) or bool(override_highlight))
+        screen.blit(surface, (self.rect.x - offset.x, self.rect.y - offset.y))
+
+    def get_state_surface(self, toggled: bool, highlighted: bool) -> (pygame.Surface, Point):
+        """
+        The pre-rendered button for the on or off, highlighted or plain state, rebuilt only when the button's properties change
+        :returns: the surface and offset from {render_button}
+        """
+        key = (self.rect.size, self.font, self.rect_line_width, self.border_radius, self.border_size,
+                self.on_text, self.on_font_color, self.on_rect_color, self.on_highlight_color, self.on_border_color,
+                self.off_text, self.off_font_color, self.off_rect_color, self.off_highlight_color, self.off_border_color)
+        if key != self.surfaces_key:
+            self.surfaces = {}
+            self.surfaces_key = key
+        surface = self.surfaces.get((toggled, highlighted))
+        if surface is None:
+            if toggled:
+                surface = render_button(self.rect.size, self.on_highlight_color if highlighted else self.on_rect_color, self.rect_line_width, self.border_radius, self.border_size, self.on_border_color, self.font, self.on_text, self.on_font_color)
+            else:
+                surface = render_button(self.rect.size, self.off_highlight_color if highlighted else self.off_rect_color, self.rect_line_width, self.border_radius, self.border_size, self.off_border_color, self.font, self.off_text, self.off_font_color)
+            self.surfaces[toggled, highlighted] = surface
+        return surface
 
     def __call__(self):
         """override the ()"""
@@ -317,6 +911,9 @@ class GameScreen:
         example.run()
     """
 
+    # the screen whose main loop is running, its event filter is applied
+    active_screen = None
+
     def __init__(self, screen: pygame.Surface, real_window_size: Point, window_size: Point = None, frame_rate: int = 30):
         """
         :screen: The pygame surface that will be drawn onto
@@ -328,22 +925,48 @@ class GameScreen:
         """
         self.window_scaled = bool(window_size) and window_size != real_window_size
         self.real_screen = screen
-        self.screen = screen if not self.window_scaled else pygame.Surface(window_size)
+        self.screen = screen if not self.window_scaled else pygame.Surface(window_size, 0, screen)
         self.real_window_size = Point._make(real_window_size)
         self.window_size = Point._make(window_size if self.window_scaled else real_window_size)
         self.window_scale = Point(self.real_window_size.x // self.window_size.x, self.real_window_size.y // self.window_size.y)
         self.frame_rate = frame_rate
         self.running = False
         self.rect = self.screen.get_rect()
+        self.integer_scale = self.window_scaled and self.real_window_size.x % self.rect.w == 0 and self.real_window_size.y % self.rect.h == 0
+        # transform.scale can only write straight into the display when the pixel formats match
+        self.direct_scale = screen.get_size() == tuple(self.real_window_size) and screen.get_bitsize() == self.screen.get_bitsize() and screen.get_masks() == self.screen.get_masks()
+        self.scaled_screen = None
         self.clock = pygame.time.Clock()
         self.game_ticks = 0
+        self.dirty_rect_mode = False
+        self.dirty_rects = []
+        self.full_redraw = True
+        self.logic_rate = None
+        self.max_logic_steps = 5
+        self.render_enabled = True
+        self.interpolation = 0.0
+        self.logic_time = time.perf_counter()
+        self.logic_lag = 0.0
+        self.fast_forward = False
+        self.fast_forward_render_every = 10
+        self.scheduler = Scheduler()
+        self.idle = False
+        self.needs_redraw = True
+        self.event_handlers = {QUIT: self.quit, VIDEOEXPOSE: self.expose}
+        for event_type, name in ((KEYDOWN, 'key_down'), (KEYUP, 'key_up'), (MOUSEBUTTONDOWN, 'mouse_button_down'), (MOUSEBUTTONUP, 'mouse_button_up')):
+            # only events a subclass actually handles are let through {self.filter_events}
+            if getattr(type(self), name) is not getattr(GameScreen, name):
+                self.event_handlers[event_type] = getattr(self, name)
 
     def get_scaled_mouse_pos(self) -> Point:
         pos = pygame.mouse.get_pos()
         return Point(pos[0] // self.window_scale.x, pos[1] // self.window_scale.y)
 
     def tick(self):
-        self.clock.tick(self.frame_rate)
+        if self.fast_forward:
+            self.clock.tick()
+        else:
+            self.clock.tick(self.frame_rate)
         self.game_ticks += 1
         if self.game_ticks > 999999999999999999999:
             self.game_ticks = 0
@@ -360,33 +983,220 @@ class GameScreen:
     def mouse_button_up(self, event: pygame.event.Event):
         """Function called when a pygame key_down MOUSEBUTTONDOWN is triggered"""
 
+    def quit(self, event: pygame.event.Event):
+        """Function called when a pygame QUIT event is triggered"""
+        sys.exit()
+
+    def register_event_handler(self, event_type: int, handler: callable = None):
+        """
+        Call {handler} with every event of {event_type}
+        :handler: Optional. defaults to None. if handler is None the event type is no longer handled
+        """
+        if handler:
+            self.event_handlers[event_type] = handler
+        else:
+            self.event_handlers.pop(event_type, None)
+        if GameScreen.active_screen is self:
+            self.filter_events()
+
+    def filter_events(self):
+        """
+        Only let the event types in {self.event_handlers} onto the pygame event queue
+        a subclass that overrides {self.handle_event} gets every event type, as it may handle types that are not registered
+        """
+        if type(self).handle_event is not GameScreen.handle_event:
+            pygame.event.set_allowed(None)
+            return
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.event_handlers))
+
     def handle_event(self, event: pygame.event.Event):
         """Handle a pygame events"""
-        if event.type == QUIT:
-            sys.exit()
-        elif event.type == KEYDOWN:
-            self.key_down(event)
-        elif event.type == KEYUP:
-            self.key_up(event)
-        elif event.type == MOUSEBUTTONDOWN:
-            self.mouse_button_down(event)
-        elif event.type == MOUSEBUTTONUP:
-            self.mouse_button_up(event)
+        handler = self.event_handlers.get(event.type)
+        if handler:
+            handler(event)
+            if self.idle:
+                self.needs_redraw = True
+
+    def expose(self, event: pygame.event.Event):
+        """Function called when a pygame VIDEOEXPOSE event is triggered, the window has to be drawn again"""
+        # the whole window, not just the dirty rects of the next frame
+        self.mark_dirty()
+        self.request_redraw()
+
+    def request_redraw(self):
+        """Draw the next frame of an idle screen, e.g.: from a scheduled job that changes what is shown"""
+        self.needs_redraw = True
+
+    def wait_for_event(self):
+        """Sleep until an event arrives or the next job of {self.scheduler} is due, then handle the event"""
+        timeout = self.scheduler.time_until_next()
+        if timeout is None:
+            event = pygame.event.wait()
+        elif timeout > 0:
+            event = pygame.event.wait(math.ceil(timeout * 1000))
+        else:
+            # a job is overdue, and a timeout of 0 would make pygame wait forever
+            return
+        if event.type != NOEVENT:
+            self.handle_event(event)
 
     def update(self):
-        """Run every frame, meant for drawing and update logic"""
+        """
+        Run every frame, meant for drawing and update logic
+        when {self.logic_rate} is set this is only meant for drawing, {self.interpolation} is how far the
+        current frame is between the last call to {self.fixed_update} and the next one, from 0 to 1
+        """
         self.screen.fill((0, 0, 100))
 
+    def fixed_update(self):
+        """Run {self.logic_rate} times a second regardless of the frame rate when {self.logic_rate} is set, meant for update logic"""
+
+    def toggle_fast_forward(self, enabled: bool = None):
+        """
+        Turn fast forward mode on or off
+        in fast forward mode the frame rate is not limited, {self.fixed_update} runs once per frame
+        and only every {self.fast_forward_render_every} frames are drawn
+        :enabled: Optional. defaults to None. if enabled is None fast forward is toggled
+        """
+        self.fast_forward = not self.fast_forward if enabled is None else enabled
+        self.reset_logic_clock()
+
+    def frame_due(self) -> bool:
+        """:returns: whether the current frame should be shown"""
+        return not self.fast_forward or self.game_ticks % self.fast_forward_render_every == 0
+
+    def reset_logic_clock(self):
+        """Drop any logic steps that are owed, e.g.: after returning from another screen's loop"""
+        self.logic_time = time.perf_counter()
+        self.logic_lag = 0.0
+
+    def run_logic(self):
+        """Call {self.fixed_update} once for every 1 / {self.logic_rate} seconds since the last call, at most {self.max_logic_steps} times"""
+        now = time.perf_counter()
+        self.logic_lag += now - self.logic_time
+        self.logic_time = now
+        step = 1 / self.logic_rate
+        steps = 0
+        while self.logic_lag >= step and self.running:
+            if steps >= self.max_logic_steps:
+                self.logic_lag %= step
+                break
+            self.fixed_update()
+            self.logic_lag = max(self.logic_lag - step, 0.0)
+            steps += 1
+        self.interpolation = min(self.logic_lag / step, 1.0)
+
+    def mark_dirty(self, rect: Rect = None):
+        """
+        Report a region of {self.screen} that changed this frame, only used when {self.dirty_rect_mode} is True
+        :rect: Optional. defaults to None. the changed region in game pixels. if rect is None the whole screen is updated
+        """
+        if rect is None:
+            self.full_redraw = True
+        elif not self.full_redraw:
+            self.dirty_rects.append(Rect(rect))
+
+    def to_real_rect(self, rect: Rect) -> Rect:
+        """Convert {rect} from game pixels to real computer pixels"""
+        left = rect.left * self.real_window_size.x // self.rect.w
+        top = rect.top * self.real_window_size.y // self.rect.h
+        right = -(-rect.right * self.real_window_size.x // self.rect.w)
+        bottom = -(-rect.bottom * self.real_window_size.y // self.rect.h)
+        return Rect(left, top, right - left, bottom - top)
+
+    def scale_region(self, rect: Rect, real_rect: Rect):
+        """
+        Scale {rect} of {self.screen} into {real_rect} of {self.real_screen}
+        the scaled pixels are written into the display, or into a reused surface if the formats differ, so no new surface is made
+        """
+        if self.direct_scale:
+            pygame.transform.scale(self.screen.subsurface(rect), real_rect.size, self.real_screen.subsurface(real_rect))
+        else:
+            if self.scaled_screen is None:
+                self.scaled_screen = pygame.Surface(self.real_window_size, 0, self.screen)
+            pygame.transform.scale(self.screen.subsurface(rect), real_rect.size, self.scaled_screen.subsurface(real_rect))
+            self.real_screen.blit(self.scaled_screen, real_rect, real_rect)
+
+    def present(self):
+        """
+        Copy {self.screen} onto the display
+        in dirty rect mode only the regions passed to {self.mark_dirty} are scaled and updated.
+        this needs a whole number scale, since otherwise scaled regions would not line up with a scaled frame
+        """
+        if self.dirty_rect_mode and not self.full_redraw and (self.integer_scale or not self.window_scaled):
+            real_rects = []
+            for rect in self.dirty_rects:
+                rect = rect.clip(self.rect)
+                if rect.w > 0 and rect.h > 0:
+                    real_rect = self.to_real_rect(rect)
+                    if self.window_scaled:
+                        self.scale_region(rect, real_rect)
+                    real_rects.append(real_rect)
+            if real_rects:
+                pygame.display.update(real_rects)
+        else:
+            if self.window_scaled:
+                self.scale_region(self.rect, Rect((0, 0), self.real_window_size))
+            pygame.display.update()
+        self.dirty_rects.clear()
+        self.full_redraw = False
+
     def run(self):
-        """Run the main loop"""
+        """
+        Run the main loop
+        if {self.logic_rate} is set, {self.fixed_update} runs at that rate and {self.update} only runs while {self.render_enabled} is True
+        see {self.toggle_fast_forward} for running as fast as possible
+        if {self.idle} is True the screen is static: the loop sleeps until an event or a scheduled job,
+        and only draws after an event was handled or {self.request_redraw} was called
+        """
         self.running = True
+        self.needs_redraw = True
+        self.mark_dirty()
+        self.reset_logic_clock()
+        parent_screen = GameScreen.active_screen
+        GameScreen.active_screen = self
+        if parent_screen:
+            parent_screen.scheduler.pause()
+        self.filter_events()
+        try:
+            self.main_loop()
+        finally:
+            GameScreen.active_screen = parent_screen
+            if parent_screen:
+                parent_screen.scheduler.resume()
+                parent_screen.filter_events()
+            else:
+                pygame.event.set_allowed(None)
+
+    def main_loop(self):
+        """The body of {self.run}, runs until {self.running} is False"""
         while self.running:
+            if self.idle and not self.needs_redraw:
+                self.wait_for_event()
             for event in pygame.event.get():
                 self.handle_event(event)
-            self.update()
-            if self.window_scaled:
-                self.real_screen.blit(pygame.transform.scale(self.screen, self.real_window_size), (0, 0))
-            pygame.display.update()
+            self.scheduler.run_pending()
+            if self.idle:
+                if not (self.needs_redraw and self.running):
+                    # nothing was drawn, so there is no frame rate to keep and the next wait does the sleeping
+                    continue
+                self.needs_redraw = False
+                self.update()
+                self.present()
+            elif not self.logic_rate:
+                self.update()
+                if self.frame_due():
+                    self.present()
+            else:
+                if self.fast_forward:
+                    self.fixed_update()
+                    self.reset_logic_clock()
+                else:
+                    self.run_logic()
+                if self.render_enabled and self.frame_due():
+                    self.update()
+                    self.present()
             self.tick()
 
 class MenuScreen(GameScreen):
@@ -397,9 +1207,35 @@ class MenuScreen(GameScreen):
 
     def __init__(self, screen: pygame.Surface, real_window_size: Point, window_size: Point = None, frame_rate: int = 30):
         super().__init__(screen, real_window_size, window_size, frame_rate)
+        self.use_button_grid = False
+        self.button_grid = None
         self.buttons = []
         self.button_index = 0
 
+    @property
+    def buttons(self) -> list:
+        return self._buttons
+
+    @buttons.setter
+    def buttons(self, buttons: list):
+        self._buttons = buttons
+        self.button_grid = None
+
+    def rebuild_button_grid(self):
+        """Call after changing {self.buttons} in place or moving a button while {self.use_button_grid} is True"""
+        self.button_grid = None
+
+    def buttons_at(self, pos: Point) -> [int]:
+        """
+        The indices of the buttons whose rects contain {pos}, in order
+        if {self.use_button_grid} is True the buttons are found through a RectGrid instead of testing every rect
+        """
+        if not self.use_button_grid:
+            return [i for i, button in enumerate(self.buttons) if button.rect.collidepoint(pos)]
+        if self.button_grid is None:
+            self.button_grid = RectGrid([button.rect for button in self.buttons])
+        return self.button_grid.query(pos)
+
     def key_down(self, event: pygame.event.Event):
         if event.key == K_UP or event.key == K_RIGHT or event.key == K_DOWN or event.key == K_LEFT:
             if event.key == K_DOWN or event.key == K_RIGHT:
@@ -412,7 +1248,15 @@ class MenuScreen(GameScreen):
                 if self.button_index < 0:
                     self.button_index = len(self.buttons) - 1
         elif event.key == K_RETURN or event.key == K_SPACE:
-            self.buttons[self.button_index]()
+            self.press_button(self.button_index)
+
+    def press_button(self, index: int):
+        """Call the button at {index} in {self.buttons} and select it"""
+        self.button_index = index
+        self.buttons[index]()
+        if self.idle:
+            # the button is drawn in its clicked color once, draw it again after that frame to show it released
+            self.scheduler.call_later(1 / self.frame_rate, self.request_redraw)
 
     def draw_buttons(self, screen: pygame.Surface = None):
         """Draw the buttons"""
@@ -430,7 +1274,5 @@ class MenuScreen(GameScreen):
                 mouse_pos = self.get_scaled_mouse_pos()
             else:
                 mouse_pos = Point._make(pygame.mouse.get_pos())
-            for i, button in enumerate(self.buttons):
-                if button.rect.collidepoint(mouse_pos):
-                    self.button_index = i
-                    button()
+            for i in self.buttons_at(mouse_pos):
+                self.press_button(i)
@@ -1,20 +1,23 @@
-import pygame
-from copy import copy
-from enum import Enum
+import argparse, os, pygame
 from pygame.locals import *
 from pygame_tools import *
-from random import randrange, choice
+from replay import Replay
+from snake_state import Direction, SnakeState
 
-class Direction(Enum):
-    UP = 0
-    LEFT = 270
-    DOWN = 180
-    RIGHT = 90
+SPRITE_ROTATIONS = {
+        Direction.UP: 0,
+        Direction.LEFT: 90,
+        Direction.DOWN: 180,
+        Direction.RIGHT: 270,
+        }
+
+SPRITE_NAMES = ('head', 'tail', 'tail_curve_left', 'tail_curve_right', 'tail_end')
 
 class DeathScreen(MenuScreen):
 
     def __init__(self, screen: pygame.Surface, game_screen: pygame.Surface, real_window_size: Point, window_size: Point, score: int):
         super().__init__(screen, real_window_size, window_size)
+        self.idle = True
         self.screen = game_screen
         self.button_font = pygame.font.SysFont('Consolas', 13)
         self.sub_window_size = Point(200, 100)
@@ -33,12 +36,10 @@ class DeathScreen(MenuScreen):
 
     def mouse_button_down(self, event: pygame.event.Event):
         if event.button == 1:
-            mouse_pos = Point._make(pygame.mouse.get_pos())
-            mouse_pos = Point(mouse_pos.x // self.window_scale.x, mouse_pos.y // self.window_scale.y)
-            for i, button in enumerate(self.buttons):
-                if Rect((button.rect.x + self.sub_window_rect.x, button.rect.y + self.sub_window_rect.y), button.rect.size).collidepoint(mouse_pos):
-                    self.button_index = i
-                    button()
+            mouse_pos = self.get_scaled_mouse_pos()
+            # the buttons are positioned inside the sub window
+            for i in self.buttons_at((mouse_pos.x - self.sub_window_rect.x, mouse_pos.y - self.sub_window_rect.y)):
+                self.press_button(i)
 
     def play_again(self):
         self.running = False
@@ -51,13 +52,17 @@ class DeathScreen(MenuScreen):
 
 class MainMenu(MenuScreen):
 
-    def __init__(self):
+    def __init__(self, replay_path: str = None):
+        """:replay_path: Optional. defaults to None. passed on to {PySnake}, if set each game's replay is saved to a file named after it"""
         pygame.init()
         real_size = Point(600, 600)
-        pygame.display.set_icon(pygame.image.load('assets/logo.png'))
+        pygame.display.set_icon(load_image('assets/logo.png'))
+        # set_icon keeps its own copy
+        asset_cache.release('assets/logo.png')
         super().__init__(pygame.display.set_mode(real_size), real_size, Point(real_size.x / 2, real_size.y / 2))
-        self.background = pygame.image.load('assets/background.png')
-        self.game = PySnake(self)
+        self.idle = True
+        self.background = load_image('assets/background.png', convert = 'convert_alpha')
+        self.game = PySnake(self, replay_path)
         font = pygame.font.SysFont('consolas', 25)
         self.buttons = [
                 Button(self.game.run, 'Start', Rect(20, 230, 120, 50), font, highlight_color = None, border_size = 2, border_radius = 20),
@@ -73,166 +78,199 @@ class MainMenu(MenuScreen):
 
 class PySnake(GameScreen):
 
-    def __init__(self, parent):
+    def __init__(self, parent, replay_path: str = None):
+        """
+        :parent: the screen whose display this game is drawn on
+        :replay_path: Optional. defaults to None. if set, each game's replay is saved when the snake dies, see {self.replay_file_name}
+        """
         super().__init__(parent.real_screen, parent.real_window_size, parent.window_size)
-        self.grid_size = Point(20, 20)
+        self.state = SnakeState(20, 20)
+        self.replay = Replay.start(self.state)
+        self.replay_path = replay_path
+        self.games_played = 0
         self.cell_size = Point(15, 15)
-        self.reset()
-        head_image = pygame.image.load('assets/head.png')
-        self.head_images = {
-                Direction.UP: head_image,
-                Direction.LEFT: pygame.transform.rotate(head_image, 90),
-                Direction.DOWN: pygame.transform.rotate(head_image, 180),
-                Direction.RIGHT: pygame.transform.rotate(head_image, 270),
-                }
-        tail_image = pygame.image.load('assets/tail.png')
-        self.tail_images = {
-                Direction.UP: tail_image,
-                Direction.LEFT: pygame.transform.rotate(tail_image, 90),
-                Direction.DOWN: pygame.transform.rotate(tail_image, 180),
-                Direction.RIGHT: pygame.transform.rotate(tail_image, 270),
-                }
-        tail_curve_right_image = pygame.image.load('assets/tail_curve_right.png')
-        self.tail_curve_right_images = {
-                Direction.UP: tail_curve_right_image,
-                Direction.LEFT: pygame.transform.rotate(tail_curve_right_image, 90),
-                Direction.DOWN: pygame.transform.rotate(tail_curve_right_image, 180),
-                Direction.RIGHT: pygame.transform.rotate(tail_curve_right_image, 270),
-                }
-        tail_curve_left_image = pygame.image.load('assets/tail_curve_left.png')
-        self.tail_curve_left_images = {
-                Direction.UP: tail_curve_left_image,
-                Direction.LEFT: pygame.transform.rotate(tail_curve_left_image, 90),
-                Direction.DOWN: pygame.transform.rotate(tail_curve_left_image, 180),
-                Direction.RIGHT: pygame.transform.rotate(tail_curve_left_image, 270),
-                }
-        tail_end_image = pygame.image.load('assets/tail_end.png')
-        self.tail_end_images = {
-                Direction.UP: tail_end_image,
-                Direction.LEFT: pygame.transform.rotate(tail_end_image, 90),
-                Direction.DOWN: pygame.transform.rotate(tail_end_image, 180),
-                Direction.RIGHT: pygame.transform.rotate(tail_end_image, 270),
-                }
-        self.fruit_image = pygame.image.load('assets/fruit.png')
-        self.movement_delay = TrueEvery(5)
+        self.background = None
+        self.background_key = None
+        self.changed_rects = [self.rect]
+        # the references are held until {self.release}, so other screens loading images cannot evict the sprites
+        sprites = {'fruit': load_image('assets/fruit.png')}
+        for name in SPRITE_NAMES:
+            for direction, angle in SPRITE_ROTATIONS.items():
+                sprites[name, direction] = load_image(f'assets/{name}.png', angle)
+        self.sprites = TextureAtlas(sprites)
+        self.holds_sprites = True
+        grid_size = self.state.grid_size
+        self.body_layer = pygame.Surface((grid_size.x * self.cell_size.x, grid_size.y * self.cell_size.y), SRCALPHA)
+        self.render_tail()
+        self.logic_rate = self.frame_rate / 5
         self.score_font = pygame.font.SysFont('Consolas', 10)
+        self.dirty_rect_mode = True
 
     def update(self):
+        for rect in self.changed_rects:
+            self.mark_dirty(rect)
+        self.changed_rects.clear()
         self.draw_background()
         self.draw_head()
         self.draw_tail()
         self.draw_fruit()
         self.draw_score()
-        if self.movement_delay():
-            self.move()
-            self.update_tail()
-            if self.check_collision():
-                DeathScreen(self.real_screen, self.screen, self.real_window_size, self.window_size, self.score).run()
-                self.reset()
-            elif self.check_fruit():
-                self.score += 1
-                self.length_to_add += 2
-                self.fruit = self.new_fruit()
+
+    def fixed_update(self):
+        state = self.state
+        previous_fruit = state.fruit
+        state.step()
+        self.replay.record(state.last_direction)
+        self.update_body_layer()
+        self.changed_rects += [self.cell_rect(state.previous_head), self.cell_rect(state.head)]
+        if state.removed_tail_end:
+            self.changed_rects += [self.cell_rect(state.removed_tail_end), self.cell_rect(state.tail[-1][0])]
+        if not state.alive:
+            self.games_played += 1
+            if self.replay_path:
+                self.replay.save(self.replay_file_name())
+            DeathScreen(self.real_screen, self.screen, self.real_window_size, self.window_size, state.score).run()
+            self.reset()
+        elif state.ate_fruit:
+            self.changed_rects += [self.cell_rect(previous_fruit), self.score_rect(state.score - 1).union(self.score_rect(state.score))]
+            if state.fruit:
+                self.changed_rects.append(self.cell_rect(state.fruit))
+        if len(self.changed_rects) > 64:
+            # many moves without a frame drawn, e.g.: while rendering is disabled
+            self.changed_rects = [self.rect]
 
     def key_down(self, event: pygame.event.Event):
-        if event.key == K_w and self.last_direction != Direction.DOWN:
-            self.direction = Direction.UP
-        elif event.key == K_a and self.last_direction != Direction.RIGHT:
-            self.direction = Direction.LEFT
-        elif event.key == K_s and self.last_direction != Direction.UP:
-            self.direction = Direction.DOWN
-        elif event.key == K_d and self.last_direction != Direction.LEFT:
-            self.direction = Direction.RIGHT
+        if event.key == K_w:
+            self.state.turn(Direction.UP)
+        elif event.key == K_a:
+            self.state.turn(Direction.LEFT)
+        elif event.key == K_s:
+            self.state.turn(Direction.DOWN)
+        elif event.key == K_d:
+            self.state.turn(Direction.RIGHT)
+        elif event.key == K_f:
+            self.toggle_fast_forward()
 
     def reset(self):
-        self.head = Point(self.grid_size.x // 2, self.grid_size.y // 2)
-        self.previous_head = self.head
-        self.tail = []
-        self.direction = Direction.UP
-        self.last_direction = self.direction
-        self.length_to_add = 2
-        self.score = 0
-        self.fruit = self.new_fruit()
-
-    def update_tail(self):
-        self.tail.insert(0, (self.previous_head, self.previous_direction, self.last_direction))
-        if self.length_to_add > 0:
-            self.length_to_add -= 1
-        else:
-            self.tail.pop(-1)
+        self.state.reset()
+        self.replay = Replay.start(self.state)
+        self.render_tail()
+        self.reset_logic_clock()
+        self.changed_rects.append(self.rect)
 
     def draw_background(self):
-        self.screen.fill('#008000')
-        for i in range(self.grid_size.y):
-            for j in range(self.grid_size.x):
-                if (i * self.grid_size.x + j + i) % 2:
-                    self.screen.fill('#007200', ((j * self.cell_size.x, i * self.cell_size.y), self.cell_size))
+        grid_size = self.state.grid_size
+        background_key = (grid_size.x, grid_size.y, self.cell_size.x, self.cell_size.y)
+        if self.background_key != background_key:
+            self.background = self.render_background()
+            self.background_key = background_key
+        self.screen.blit(self.background, (0, 0))
+
+    def render_background(self) -> pygame.Surface:
+        """render the checkerboard for the current grid size and {self.cell_size} onto a new surface"""
+        grid_size = self.state.grid_size
+        background = pygame.Surface(self.screen.get_size(), 0, self.screen)
+        background.fill('#008000')
+        for i in range(grid_size.y):
+            for j in range(grid_size.x):
+                if (i * grid_size.x + j + i) % 2:
+                    background.fill('#007200', ((j * self.cell_size.x, i * self.cell_size.y), self.cell_size))
+        return background
 
     def draw_head(self):
-        self.screen.blit(self.head_images[self.last_direction], (self.head.x * self.cell_size.x, self.head.y * self.cell_size.y))
+        head = self.state.head
+        self.sprites.blit(self.screen, ('head', self.state.last_direction), (head.x * self.cell_size.x, head.y * self.cell_size.y))
 
     def draw_tail(self):
-        prev_pos = self.head
-        prev_direction = self.last_direction
-        for pos, direction, next_direction in self.tail:
-            if pos == self.tail[-1][0]:
-                self.screen.blit(self.tail_end_images[next_direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
-            elif direction == prev_direction:
-                self.screen.blit(self.tail_images[direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
+        self.screen.blit(self.body_layer, (0, 0))
+
+    def render_tail(self):
+        """redraw every tail segment onto a cleared {self.body_layer}"""
+        self.body_layer.fill((0, 0, 0, 0))
+        tail = self.state.tail
+        prev_pos = self.state.head
+        prev_direction = self.state.last_direction
+        tail_end = tail[-1][0] if tail else None
+        for pos, direction, next_direction in tail:
+            if pos == tail_end:
+                self.draw_segment(pos, ('tail_end', next_direction))
             else:
-                if direction == Direction.RIGHT or direction == Direction.UP:
-                    if prev_pos.x + prev_pos.y - pos.x - pos.y < 0:
-                        self.screen.blit(self.tail_curve_left_images[direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
-                    else:
-                        self.screen.blit(self.tail_curve_right_images[direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
-                else:
-                    if prev_pos.x + prev_pos.y - pos.x - pos.y < 0:
-                        self.screen.blit(self.tail_curve_right_images[direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
-                    else:
-                        self.screen.blit(self.tail_curve_left_images[direction], (pos.x * self.cell_size.x, pos.y * self.cell_size.y))
+                self.draw_segment(pos, self.segment_sprite(pos, direction, prev_pos, prev_direction))
             prev_pos = pos
             prev_direction = direction
 
+    def update_body_layer(self):
+        """
+        redraw only the cells of {self.body_layer} changed by the last move
+        a segment's sprite never changes once it is added, apart from the segment at the end of the tail
+        """
+        state = self.state
+        if state.tail:
+            pos, direction, _next_direction = state.tail[0]
+            self.draw_segment(pos, self.segment_sprite(pos, direction, state.head, state.last_direction))
+        if state.removed_tail_end:
+            self.body_layer.fill((0, 0, 0, 0), self.cell_rect(state.removed_tail_end))
+        if state.tail:
+            pos, _direction, next_direction = state.tail[-1]
+            self.draw_segment(pos, ('tail_end', next_direction))
+
+    def draw_segment(self, pos: Point, sprite):
+        """replace the cell at {pos} of {self.body_layer} with {sprite}"""
+        rect = self.cell_rect(pos)
+        self.body_layer.fill((0, 0, 0, 0), rect)
+        # the cell is cleared, so taking the max copies the sprite's pixels and alpha exactly
+        self.sprites.blit(self.body_layer, sprite, rect, BLEND_RGBA_MAX)
+
+    def segment_sprite(self, pos: Point, direction: Direction, prev_pos: Point, prev_direction: Direction) -> tuple:
+        """the sprite of the segment at {pos} that is followed by the segment or head at {prev_pos}"""
+        if direction == prev_direction:
+            return ('tail', direction)
+        if direction == Direction.RIGHT or direction == Direction.UP:
+            if prev_pos.x + prev_pos.y - pos.x - pos.y < 0:
+                return ('tail_curve_left', direction)
+            return ('tail_curve_right', direction)
+        if prev_pos.x + prev_pos.y - pos.x - pos.y < 0:
+            return ('tail_curve_right', direction)
+        return ('tail_curve_left', direction)
+
     def draw_fruit(self):
-        self.screen.blit(self.fruit_image, (self.fruit.x * self.cell_size.x, self.fruit.y * self.cell_size.y))
+        fruit = self.state.fruit
+        if fruit:
+            self.sprites.blit(self.screen, 'fruit', (fruit.x * self.cell_size.x, fruit.y * self.cell_size.y))
 
     def draw_score(self):
-        self.screen.blit(self.score_font.render(f'Score: {self.score}', True, (255, 255, 255)), (2, 2))
-
-    def move(self):
-        self.previous_head = copy(self.head)
-        self.previous_direction = self.last_direction
-        self.last_direction = self.direction
-        if self.direction == Direction.UP:
-            self.head.y -= 1
-        elif self.direction == Direction.LEFT:
-            self.head.x -= 1
-        elif self.direction == Direction.DOWN:
-            self.head.y += 1
-        elif self.direction == Direction.RIGHT:
-            self.head.x += 1
-
-    def check_collision(self):
-        if self.head.x < 0 or self.head.x >= self.grid_size.x or self.head.y < 0 or self.head.y >= self.grid_size.y or self.head in [pos for pos, _direction, _next_direction in self.tail]:
-            return True
-        return False
-
-    def random_spot_on_board(self):
-        return Point(randrange(0, self.grid_size.x), randrange(0, self.grid_size.y))
-
-    def check_fruit(self):
-        return self.fruit == self.head
-
-    def new_fruit(self):
-        possible_spots = []
-        for i in range(self.grid_size.y):
-            for j in range(self.grid_size.x):
-                possible_spots.append(Point(j, i))
-        possible_spots.remove(self.head)
-        for spot, _direction, _next_direction in self.tail:
-            possible_spots.remove(spot)
-        return choice(possible_spots)
+        self.screen.blit(render_text(self.score_font, f'Score: {self.state.score}', True, (255, 255, 255)), (2, 2))
+
+    def release(self):
+        """Give the sprite images back to {asset_cache} once this game will not be built again, they stay cached until evicted"""
+        if self.holds_sprites:
+            self.holds_sprites = False
+            asset_cache.release('assets/fruit.png')
+            for name in SPRITE_NAMES:
+                for angle in SPRITE_ROTATIONS.values():
+                    asset_cache.release(f'assets/{name}.png', angle)
+
+    def replay_file_name(self) -> str:
+        """
+        The file the replay of the game that just ended is saved to
+        {self.replay_path} is formatted with the game's {seed} and {game} number, counting from 1,
+        if it has neither field the game number is added before the extension, e.g.: 'game.snake' saves 'game-1.snake', 'game-2.snake', ...
+        """
+        if '{' not in self.replay_path:
+            root, extension = os.path.splitext(self.replay_path)
+            return f'{root}-{self.games_played}{extension}'
+        return self.replay_path.format(seed = self.state.seed, game = self.games_played)
+
+    def score_rect(self, score: int) -> Rect:
+        """the area of {self.screen} covered by the score text when the score is {score}"""
+        return Rect((2, 2), self.score_font.size(f'Score: {score}'))
+
+    def cell_rect(self, pos: Point) -> Rect:
+        """the area of {self.screen} covered by the cell at {pos}"""
+        return Rect(pos.x * self.cell_size.x, pos.y * self.cell_size.y, self.cell_size.x, self.cell_size.y)
 
 
 if __name__ == '__main__':
-    MainMenu().run()
+    parser = argparse.ArgumentParser(description = 'Play snake')
+    parser.add_argument('--replay', metavar = 'PATH', help = "save each game's replay when the snake dies, PATH may use {seed} and {game}, otherwise the game number is added before the extension. play them back with replay.py")
+    MainMenu(parser.parse_args().replay).run()
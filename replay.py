@@ -0,0 +1,113 @@
+"""
+Compact recordings of snake games that can be replayed headless
+a replay file is a header followed by the direction of every move packed into 2 bits
+:example:
+
+    python replay.py game.snake
+"""
+
+import struct, sys
+from snake_state import Direction, DIRECTIONS, SnakeState
+
+MAGIC = b'SNKR'
+VERSION = 1
+# magic, version, grid width, grid height, seed, number of moves
+HEADER = struct.Struct('<4sBHHQI')
+
+class Replay:
+    """
+    The seed and moves of one game of {snake_state.SnakeState}
+    :example:
+
+        state = SnakeState()
+        replay = Replay.start(state)
+        while state.alive:
+            state.step(policy(state))
+            replay.record(state.last_direction)
+        replay.save('game.snake')
+        assert Replay.load('game.snake').play().score == state.score
+    """
+
+    def __init__(self, width: int, height: int, seed: int, moves: bytearray = None, move_count: int = 0):
+        """
+        :width: the number of cells in a row of the grid
+        :height: the number of cells in a column of the grid
+        :seed: the seed the game was started with
+        :moves: Optional. defaults to an empty bytearray. the packed directions, 4 per byte
+        :move_count: Optional. defaults to 0. the number of directions in {moves}
+        """
+        # the header stores the grid size and seed as unsigned 16 and 64 bit ints
+        if not 0 <= seed < 1 << 64:
+            raise ValueError(f'Replays need a seed from 0 to 2 ** 64 - 1, got {seed}')
+        if not (0 < width < 1 << 16 and 0 < height < 1 << 16):
+            raise ValueError(f'Replays need a grid smaller than 65536 cells each way, got {width}x{height}')
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.moves = moves if moves is not None else bytearray()
+        self.move_count = move_count
+
+    @classmethod
+    def start(cls, state: SnakeState) -> 'Replay':
+        """Begin recording {state}, which must have just been reset with a seed {HEADER} can store"""
+        return cls(state.grid_size.x, state.grid_size.y, state.seed)
+
+    def __len__(self) -> int:
+        return self.move_count
+
+    def record(self, direction: Direction):
+        """Add the direction of the next move"""
+        shift = (self.move_count & 3) * 2
+        if shift == 0:
+            self.moves.append(0)
+        self.moves[-1] |= DIRECTIONS.index(direction) << shift
+        self.move_count += 1
+
+    def directions(self):
+        """Iterate over the recorded directions"""
+        for i in range(self.move_count):
+            yield DIRECTIONS[(self.moves[i >> 2] >> ((i & 3) * 2)) & 3]
+
+    def play(self, state: SnakeState = None) -> SnakeState:
+        """
+        Run the recorded game as fast as possible
+        :state: Optional. defaults to a new SnakeState. the state to replay the game on, it is reset with the recorded seed
+        :returns: the state after the last recorded move
+        """
+        if state is None:
+            state = SnakeState(self.width, self.height, self.seed)
+        else:
+            state.reset(self.seed)
+        for direction in self.directions():
+            if not state.step(direction):
+                break
+        return state
+
+    def to_bytes(self) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, self.width, self.height, self.seed, self.move_count) + bytes(self.moves)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Replay':
+        if len(data) < HEADER.size:
+            raise ValueError('Replay is truncated')
+        magic, version, width, height, seed, move_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a snake replay or an unsupported version')
+        moves = bytearray(data[HEADER.size:HEADER.size + (move_count + 3) // 4])
+        if len(moves) * 4 < move_count:
+            raise ValueError('Replay is truncated')
+        return cls(width, height, seed, moves, move_count)
+
+    def save(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Replay':
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        state = Replay.load(path).play()
+        print(f'{path}: score {state.score}, length {len(state.tail) + 1}, ticks {state.ticks}, {"alive" if state.alive else "dead"}')
@@ -0,0 +1,81 @@
+"""A reset/step environment around {snake_state.SnakeState} for reinforcement learning"""
+
+import numpy as np
+from snake_state import Direction, DIRECTIONS, SnakeState
+
+class SnakeEnv:
+    """
+    A single game of snake observed as numpy arrays instead of rendered pixels
+    the observation is a dict of two preallocated arrays that are updated in place by every step:
+        'grid': a (3, height, width) uint8 array with channels {self.HEAD}, {self.BODY} and {self.FRUIT}
+        'direction': a one hot uint8 array of the snake's direction, in the order of {DIRECTIONS}
+    copy the arrays if an observation has to outlive the next call to {self.step} or {self.reset}
+    :example:
+
+        env = SnakeEnv()
+        observation = env.reset()
+        done = False
+        while not done:
+            observation, reward, done, info = env.step(random.randrange(4))
+    """
+
+    HEAD = 0
+    BODY = 1
+    FRUIT = 2
+
+    def __init__(self, width: int = 20, height: int = 20):
+        """
+        :width: the number of cells in a row of the grid
+        :height: the number of cells in a column of the grid
+        """
+        self.state = SnakeState(width, height)
+        self.grid = np.zeros((3, height, width), np.uint8)
+        self.direction = np.zeros(len(DIRECTIONS), np.uint8)
+        self.observation = {'grid': self.grid, 'direction': self.direction}
+        self.reset()
+
+    def reset(self) -> dict:
+        """Start a new game and return its first observation"""
+        state = self.state
+        state.reset()
+        self.grid.fill(0)
+        self.grid[self.HEAD, state.head.y, state.head.x] = 1
+        if state.fruit:
+            self.grid[self.FRUIT, state.fruit.y, state.fruit.x] = 1
+        self.direction.fill(0)
+        self.direction[DIRECTIONS.index(state.last_direction)] = 1
+        return self.observation
+
+    def step(self, action) -> (dict, float, bool, dict):
+        """
+        Move the snake once
+        :action: a {Direction}, an index into {DIRECTIONS}, or None to keep going straight
+        :returns: (observation, reward, done, info). reward is 1 for eating a fruit and -1 for dying
+        """
+        state = self.state
+        if not state.alive:
+            return self.observation, 0.0, True, self.info()
+        if action is not None and not isinstance(action, Direction):
+            action = DIRECTIONS[action]
+        previous_fruit = state.fruit
+        previous_direction = state.last_direction
+        state.step(action)
+        grid = self.grid
+        grid[self.HEAD, state.previous_head.y, state.previous_head.x] = 0
+        grid[self.BODY, state.previous_head.y, state.previous_head.x] = 1
+        if state.removed_tail_end:
+            grid[self.BODY, state.removed_tail_end.y, state.removed_tail_end.x] = 0
+        if state.in_bounds(state.head):
+            grid[self.HEAD, state.head.y, state.head.x] = 1
+        if state.ate_fruit:
+            grid[self.FRUIT, previous_fruit.y, previous_fruit.x] = 0
+            if state.fruit:
+                grid[self.FRUIT, state.fruit.y, state.fruit.x] = 1
+        if state.last_direction != previous_direction:
+            self.direction[DIRECTIONS.index(previous_direction)] = 0
+            self.direction[DIRECTIONS.index(state.last_direction)] = 1
+        reward = -1.0 if not state.alive else 1.0 if state.ate_fruit else 0.0
+        return self.observation, reward, not state.alive, self.info()
+
+    def info(self) -> dict:
+        return {'score': self.state.score, 'ticks': self.state.ticks}
@@ -0,0 +1,175 @@
+"""The rules of snake, kept free of pygame so games can be simulated headless"""
+
+from collections import deque, namedtuple
+from enum import Enum
+from random import Random, randrange
+
+class Direction(Enum):
+    UP = 0
+    LEFT = 270
+    DOWN = 180
+    RIGHT = 90
+
+DIRECTIONS = list(Direction)
+
+Cell = namedtuple('Cell', 'x y')
+
+OFFSETS = {
+        Direction.UP: (0, -1),
+        Direction.LEFT: (-1, 0),
+        Direction.DOWN: (0, 1),
+        Direction.RIGHT: (1, 0),
+        }
+
+OPPOSITES = {
+        Direction.UP: Direction.DOWN,
+        Direction.LEFT: Direction.RIGHT,
+        Direction.DOWN: Direction.UP,
+        Direction.RIGHT: Direction.LEFT,
+        }
+
+class SnakeState:
+    """
+    A game of snake without any rendering
+    :example:
+
+        state = SnakeState(20, 20)
+        while state.step(Direction.UP):
+            pass
+        print(state.score, state.ticks)
+    """
+
+    def __init__(self, width: int = 20, height: int = 20, seed: int = None):
+        """
+        :width: the number of cells in a row of the grid
+        :height: the number of cells in a column of the grid
+        :seed: Optional. defaults to None. seed for the fruit placement of the first game, a random seed is used if None
+        """
+        self.grid_size = Cell(width, height)
+        self.reset(seed)
+
+    def reset(self, seed: int = None):
+        """
+        Start a new game
+        :seed: Optional. defaults to None. seed for the fruit placement of this game, a random seed is picked if None.
+            the seed used is kept in {self.seed} so the game can be replayed
+        """
+        self.seed = seed if seed is not None else randrange(1 << 32)
+        self.random = Random(self.seed)
+        self.head = Cell(self.grid_size.x // 2, self.grid_size.y // 2)
+        self.previous_head = self.head
+        self.tail = deque()
+        self.occupied = bytearray(self.grid_size.x * self.grid_size.y)
+        self.free_cells = list(range(len(self.occupied)))
+        self.free_positions = list(range(len(self.occupied)))
+        self.free_count = len(self.free_cells)
+        self.claim_cell(self.cell_index(self.head))
+        self.direction = Direction.UP
+        self.last_direction = self.direction
+        self.previous_direction = self.direction
+        self.length_to_add = 2
+        self.score = 0
+        self.ticks = 0
+        self.alive = True
+        self.ate_fruit = False
+        self.removed_tail_end = None
+        self.fruit = self.new_fruit()
+
+    def turn(self, direction: Direction) -> bool:
+        """
+        Point the snake in {direction} for the next step
+        :returns: False if {direction} would turn the snake back on itself, in which case it is ignored
+        """
+        if direction == OPPOSITES[self.last_direction]:
+            return False
+        self.direction = direction
+        return True
+
+    def step(self, action: Direction = None) -> bool:
+        """
+        Advance the game by one move
+        :action: Optional. defaults to None. a direction passed to {self.turn} before moving
+        :returns: True if the snake is still alive after the move
+        """
+        if not self.alive:
+            return False
+        if action is not None:
+            self.turn(action)
+        self.ate_fruit = False
+        self.move()
+        self.update_tail()
+        self.ticks += 1
+        if self.check_collision():
+            self.alive = False
+        elif self.check_fruit():
+            self.score += 1
+            self.length_to_add += 2
+            self.ate_fruit = True
+            self.fruit = self.new_fruit()
+        return self.alive
+
+    def move(self):
+        self.previous_head = self.head
+        self.previous_direction = self.last_direction
+        self.last_direction = self.direction
+        dx, dy = OFFSETS[self.direction]
+        self.head = Cell(self.head.x + dx, self.head.y + dy)
+
+    def update_tail(self):
+        self.tail.appendleft((self.previous_head, self.previous_direction, self.last_direction))
+        self.occupied[self.cell_index(self.previous_head)] = 1
+        self.removed_tail_end = None
+        if self.length_to_add > 0:
+            self.length_to_add -= 1
+        else:
+            tail_end = self.removed_tail_end = self.tail.pop()[0]
+            self.occupied[self.cell_index(tail_end)] = 0
+            if tail_end != self.head:
+                self.release_cell(self.cell_index(tail_end))
+        if self.in_bounds(self.head):
+            self.claim_cell(self.cell_index(self.head))
+
+    def check_collision(self) -> bool:
+        return not self.in_bounds(self.head) or bool(self.occupied[self.cell_index(self.head)])
+
+    def in_bounds(self, pos: Cell) -> bool:
+        return 0 <= pos.x < self.grid_size.x and 0 <= pos.y < self.grid_size.y
+
+    def cell_index(self, pos: Cell) -> int:
+        """index of {pos} in {self.occupied}"""
+        return pos.y * self.grid_size.x + pos.x
+
+    def claim_cell(self, index: int):
+        """remove the cell at {index} from the free cells by swapping it past {self.free_count}"""
+        position = self.free_positions[index]
+        if position < self.free_count:
+            self.free_count -= 1
+            last = self.free_cells[self.free_count]
+            self.free_cells[position] = last
+            self.free_positions[last] = position
+            self.free_cells[self.free_count] = index
+            self.free_positions[index] = self.free_count
+
+    def release_cell(self, index: int):
+        """return the cell at {index} to the free cells by swapping it to {self.free_count}"""
+        position = self.free_positions[index]
+        if position >= self.free_count:
+            first = self.free_cells[self.free_count]
+            self.free_cells[position] = first
+            self.free_positions[first] = position
+            self.free_cells[self.free_count] = index
+            self.free_positions[index] = self.free_count
+            self.free_count += 1
+
+    def random_spot_on_board(self) -> Cell:
+        return Cell(self.random.randrange(0, self.grid_size.x), self.random.randrange(0, self.grid_size.y))
+
+    def check_fruit(self) -> bool:
+        return self.fruit == self.head
+
+    def new_fruit(self) -> Cell:
+        """:returns: a random cell not covered by the snake, or None if the snake fills the grid"""
+        if self.free_count == 0:
+            return None
+        index = self.free_cells[self.random.randrange(self.free_count)]
+        return Cell(index % self.grid_size.x, index // self.grid_size.x)
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pygame, pygame_tools
+from glob import glob
+from pygame_tools import Animation, AssetCache, Circle, CircleGroup, Point, PointArray
+
+def test_circle_group_collide_point_single_point():
+    left, right = Circle((0, 0), 5, (255, 0, 0)), Circle((20, 0), 5, (0, 255, 0))
+    group = CircleGroup([left, right])
+    assert group.collide_point((1, 1)) == [left]
+    assert group.collide_point(PointArray([(1, 1)])[0]) == [left]
+    assert group.collide_point((10, 10)) == []
+
+def test_circle_group_collide_point_many_points():
+    left, right = Circle((0, 0), 5, (255, 0, 0)), Circle((3, 0), 5, (0, 255, 0))
+    group = CircleGroup([left, right])
+    assert group.collide_point([(-4, 0), (2, 0), (50, 50)]) == [[left], [left, right], []]
+    assert group.collide_point(PointArray([(7, 0)])) == [[right]]
+
+def test_point_array_accepts_numpy_indices():
+    points = PointArray([(0, 0), (10, 0), (1, 1)])
+    far = np.flatnonzero(Point.squared_distances(points, Point(0, 0)) > 4)
+    assert [points[i] for i in far] == [Point(10, 0)]
+    points[far[0]] = (5, 5)
+    assert points[1] == Point(5, 5)
+
+def test_point_array_grows_after_numpy_queries():
+    points = PointArray([(0, 0), (3, 4)])
+    assert list(Point.distances(points, Point(0, 0))) == [0, 5]
+    circle = Circle((0, 0), 1, (0, 0, 0))
+    assert CircleGroup([circle]).collide_point(points) == [[circle], []]
+    points.append((6, 8))
+    points[0:1] = []
+    assert list(points) == [Point(3, 4), Point(6, 8)]
+
+def count_image_loads(monkeypatch) -> list:
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    loaded = []
+    load = pygame.image.load
+    monkeypatch.setattr(pygame.image, 'load', lambda path, *args: (loaded.append(path), load(path, *args))[1])
+    return loaded
+
+def test_asset_cache_transforms_without_keeping_unused_images(monkeypatch):
+    loaded = count_image_loads(monkeypatch)
+    cache = AssetCache(max_unused = 0)
+    head = cache.load('assets/head.png', rotation = 90)
+    assert head.get_size() == pygame.image.load('assets/head.png').get_size()[::-1]
+    assert cache.references('assets/head.png', 90) == 1
+    cache.release('assets/head.png', 90)
+    assert cache.references('assets/head.png', 90) == 0
+    assert not cache.entries
+    assert loaded.count('assets/head.png') == 2
+
+def test_asset_cache_reuses_unused_images(monkeypatch):
+    loaded = count_image_loads(monkeypatch)
+    cache = AssetCache(max_unused = 2)
+    first = cache.load('assets/tail.png', rotation = 180)
+    cache.release('assets/tail.png', 180)
+    assert cache.load('assets/tail.png', rotation = 180) is first
+    assert loaded == ['assets/tail.png']
+
+def test_animation_reload_keeps_shared_frames(monkeypatch):
+    monkeypatch.setattr(pygame_tools, 'asset_cache', AssetCache(max_unused = 0))
+    loaded = count_image_loads(monkeypatch)
+    animation = Animation('assets/tail*.png', [1] * len(glob('assets/tail*.png')))
+    animation.load(animation.glob_path, animation.frame_data)
+    assert sorted(loaded) == sorted(glob('assets/tail*.png'))
+    animation.release()
+    assert not pygame_tools.asset_cache.entries
@@ -0,0 +1,51 @@
+import pytest
+from replay import HEADER, Replay
+from snake_state import SnakeState
+from tournament import greedy_policy
+
+def record_game(seed: int, max_ticks: int = 2000) -> (Replay, SnakeState):
+    state = SnakeState(20, 20, seed)
+    replay = Replay.start(state)
+    while state.ticks < max_ticks and state.step(greedy_policy(state)):
+        replay.record(state.last_direction)
+    if not state.alive:
+        replay.record(state.last_direction)
+    return replay, state
+
+@pytest.mark.parametrize('seed', range(10))
+def test_round_trip_reproduces_game(seed):
+    replay, state = record_game(seed)
+    assert len(replay) == state.ticks
+    played = Replay.from_bytes(replay.to_bytes()).play()
+    assert (played.score, played.ticks, played.alive, played.head) == (state.score, state.ticks, state.alive, state.head)
+
+@pytest.mark.parametrize('move_count', [0, 1, 3, 4, 5, 9])
+def test_round_trip_keeps_directions(move_count):
+    replay, _state = record_game(1, move_count)
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert len(loaded) == len(replay)
+    assert list(loaded.directions()) == list(replay.directions())
+    assert (loaded.width, loaded.height, loaded.seed) == (replay.width, replay.height, replay.seed)
+
+def test_save_and_load(tmp_path):
+    replay, state = record_game(7)
+    path = tmp_path / 'game.snake'
+    replay.save(path)
+    assert Replay.load(path).play().score == state.score
+
+def test_truncated_replay_is_rejected():
+    data = record_game(2)[0].to_bytes()
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:HEADER.size - 1])
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:-1])
+
+def test_wrong_magic_is_rejected():
+    data = record_game(2)[0].to_bytes()
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b'XXXX' + data[4:])
+
+@pytest.mark.parametrize('seed', [-1, 1 << 64])
+def test_unstorable_seed_is_rejected(seed):
+    with pytest.raises(ValueError):
+        Replay.start(SnakeState(20, 20, seed))
@@ -0,0 +1,88 @@
+"""
+Run many headless games of snake across a process pool and report how a bot did
+:example:
+
+    python tournament.py tournament:greedy_policy --games 10000 --workers 8
+"""
+
+import argparse, importlib, os
+from concurrent.futures import ProcessPoolExecutor
+from snake_state import Direction, OFFSETS, SnakeState
+
+def greedy_policy(state: SnakeState) -> Direction:
+    """Turn towards the fruit, avoiding walls and the tail one move ahead"""
+    best = None
+    best_distance = None
+    for direction, (dx, dy) in OFFSETS.items():
+        x, y = state.head.x + dx, state.head.y + dy
+        if not (0 <= x < state.grid_size.x and 0 <= y < state.grid_size.y) or state.occupied[y * state.grid_size.x + x]:
+            continue
+        distance = abs(state.fruit.x - x) + abs(state.fruit.y - y) if state.fruit else 0
+        if best_distance is None or distance < best_distance:
+            best = direction
+            best_distance = distance
+    return best
+
+def load_policy(spec: str) -> callable:
+    """
+    Import a policy function
+    :spec: 'module:function', e.g.: 'tournament:greedy_policy'
+    """
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise ValueError(f'Policy must be given as module:function, got {spec!r}')
+    return getattr(importlib.import_module(module_name), function_name)
+
+def play_game(policy_spec: str, seed: int, width: int = 20, height: int = 20, max_ticks: int = 10000) -> dict:
+    """
+    Play one game with the policy named by {policy_spec}
+    the policy is called with the SnakeState before every move and returns a Direction, or None to keep going straight
+    :returns: a dict with the seed, score, length and tick count of the game
+    """
+    policy = load_policy(policy_spec)
+    state = SnakeState(width, height, seed)
+    while state.ticks < max_ticks and state.step(policy(state)):
+        pass
+    return {'seed': seed, 'score': state.score, 'length': len(state.tail) + 1, 'ticks': state.ticks, 'alive': state.alive}
+
+def _play_game(arguments: tuple) -> dict:
+    return play_game(*arguments)
+
+def run_tournament(policy_spec: str, seeds: [int], width: int = 20, height: int = 20, max_ticks: int = 10000, workers: int = None) -> [dict]:
+    """
+    Play a game for every seed in {seeds} across a pool of {workers} processes
+    :workers: Optional. defaults to None. the number of processes, None uses every cpu
+    :returns: the result of {play_game} for each seed, in the order of {seeds}
+    """
+    jobs = [(policy_spec, seed, width, height, max_ticks) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(_play_game, jobs, chunksize = max(1, len(jobs) // (workers * 4))))
+
+def summarize(results: [dict]) -> dict:
+    """Aggregate the results of {run_tournament}, which must not be empty"""
+    if not results:
+        raise ValueError('Cannot summarize a tournament without any games')
+    summary = {'games': len(results), 'timeouts': sum(result['alive'] for result in results)}
+    for key in ('score', 'length', 'ticks'):
+        values = [result[key] for result in results]
+        summary[key] = {'mean': sum(values) / len(values), 'min': min(values), 'max': max(values)}
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run many headless games of snake with a bot')
+    parser.add_argument('policy', help = 'the bot to run as module:function, e.g.: tournament:greedy_policy')
+    parser.add_argument('--games', type = int, default = 1000, help = 'the number of games to play')
+    parser.add_argument('--seed', type = int, default = 0, help = 'the seed of the first game, each game after it uses the next seed')
+    parser.add_argument('--workers', type = int, default = None, help = 'the number of processes, defaults to the number of cpus')
+    parser.add_argument('--width', type = int, default = 20)
+    parser.add_argument('--height', type = int, default = 20)
+    parser.add_argument('--max-ticks', type = int, default = 10000, help = 'end a game after this many moves')
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error('--games must be at least 1')
+    load_policy(args.policy)
+    summary = summarize(run_tournament(args.policy, range(args.seed, args.seed + args.games), args.width, args.height, args.max_ticks, args.workers))
+    print(f"games: {summary['games']} (timed out: {summary['timeouts']})")
+    for key in ('score', 'length', 'ticks'):
+        print(f"{key}: mean {summary[key]['mean']:.2f}, min {summary[key]['min']}, max {summary[key]['max']}")